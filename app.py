@@ -1,21 +1,17 @@
 import streamlit as st
 from PIL import Image
-import fitz  # PyMuPDF
 import io
 import datetime
-import easyocr
-from utils.ocr import extract_text_from_image  # ✅ Now uses EasyOCR
+from utils.ocr import iter_pdf_previews
+from utils.ocr_jobs import submit_ocr_job, submit_pdf_ocr_job, get_job  # ✅ Background EasyOCR jobs (shared reader)
 from utils.resume_generator import generate_resume
 from utils.recommender import recommend_events
-from utils.database import save_achievement, get_achievements
-from utils.auth import authenticate_user
+from utils.database import list_achievements, get_achievement_details
+from utils.auth import authenticate_user, client_address, LoginRateLimited, issue_session_token, verify_session_token
 
 # 🎨 Set Streamlit Page Config
 st.set_page_config(page_title="Student Portfolio", page_icon="📜", layout="wide")
 
-# ✅ Initialize EasyOCR
-reader = easyocr.Reader(["en"])  # English Language
-
 # 🎉 App Title
 st.title("📜 Student Digital Portfolio & Resume Generator")
 
@@ -25,6 +21,13 @@ if "authenticated" not in st.session_state:
 if "username" not in st.session_state:
     st.session_state.username = None
 
+# 🎫 A signed session token in the URL logs new tabs/reconnects in without re-checking users.json
+if not st.session_state.authenticated:
+    session_user = verify_session_token(st.query_params.get("session"))
+    if session_user:
+        st.session_state.authenticated = True
+        st.session_state.username = session_user
+
 # 🔐 User Authentication
 if not st.session_state.authenticated:
     st.header("🔑 Login")
@@ -32,13 +35,18 @@ if not st.session_state.authenticated:
     password = st.text_input("🔒 Password", type="password")
 
     if st.button("🚀 Login"):
-        if authenticate_user(username, password):
-            st.session_state.authenticated = True
-            st.session_state.username = username
-            st.success("✅ Logged in successfully!")
-            st.experimental_rerun()
-        else:
-            st.error("❌ Invalid username or password.")
+        client_id = client_address(st.context.headers.get("X-Forwarded-For"))  # Hop added by our load balancer
+        try:
+            if authenticate_user(username, password, client_id=client_id):
+                st.session_state.authenticated = True
+                st.session_state.username = username
+                st.query_params["session"] = issue_session_token(username)
+                st.success("✅ Logged in successfully!")
+                st.rerun()
+            else:
+                st.error("❌ Invalid username or password.")
+        except LoginRateLimited as e:
+            st.error(f"⏳ {e}")
     st.stop()
 
 # 📌 Sidebar Navigation
@@ -48,20 +56,6 @@ page = st.sidebar.radio(
     ["🏠 Home", "📄 Resume Generator", "🎟 Event Recommendations", "📂 Digital Portfolio"]
 )
 
-# 🖼 Function to Extract Images from PDF
-def extract_images_from_pdf(pdf_file):
-    images = []
-    try:
-        pdf_document = fitz.open(stream=pdf_file.read(), filetype="pdf")
-        for page_num in range(len(pdf_document)):
-            page = pdf_document.load_page(page_num)
-            for img in page.get_images(full=True):
-                base_image = pdf_document.extract_image(img[0])
-                images.append(Image.open(io.BytesIO(base_image["image"])))
-    except Exception as e:
-        st.error(f"⚠ Error extracting images from PDF: {e}")
-    return images
-
 # 📂 **Digital Portfolio**
 if page == "📂 Digital Portfolio":
     st.header("📂 My Digital Portfolio")
@@ -76,21 +70,28 @@ if page == "📂 Digital Portfolio":
     education = st.text_area("📚 Education", value="Your Education Details")
     work_experience = st.text_area("💼 Work Experience", value="Your Work Experience Details")
 
+    # 📇 Titles come from the small metadata index; raw OCR text is only loaded on request
+    records = list_achievements(st.session_state.username)
+    achievements = [record for record in records if record.get("category") != "Certificate"]
+    saved_certificates = [record for record in records if record.get("category") == "Certificate"]
+
     st.subheader("🏆 Achievements")
-    achievements = get_achievements(st.session_state.username)
     if achievements:
         for idx, achievement in enumerate(achievements):
-            if isinstance(achievement, dict) and "text" in achievement:
-                st.write(f"📌 *{idx + 1}:* {achievement['text']}")
+            st.write(f"📌 *{idx + 1}:* {achievement['title']}")
     else:
         st.warning("⚠ No achievements added yet.")
 
     st.subheader("📜 Certificates")
-    saved_certificates = get_achievements(st.session_state.username)
     if saved_certificates:
         for idx, cert in enumerate(saved_certificates):
-            if isinstance(cert, dict) and "text" in cert:
-                st.write(f"🏅 *Certificate {idx + 1}:* {cert['text']}")
+            st.write(f"🏅 *Certificate {idx + 1}:* {cert['title']} ({cert.get('date') or 'undated'})")
+        selected = st.selectbox(
+            "🔎 View extracted text", range(len(saved_certificates)), index=None,
+            format_func=lambda idx: f"Certificate {idx + 1}: {saved_certificates[idx]['title']}",
+        )
+        if selected is not None:
+            st.text(get_achievement_details(saved_certificates[selected]))
     else:
         st.warning("⚠ No certificates uploaded yet.")
 
@@ -112,9 +113,9 @@ elif page == "📄 Resume Generator":
     projects = st.text_area("🚀 Projects (comma-separated)")
     user_achievements = st.text_area("🏆 Achievements (comma-separated)")
 
-    saved_achievements = get_achievements(st.session_state.username)
+    saved_achievements = list_achievements(st.session_state.username)
     all_achievements = "\n".join(
-        [f"• {ach['text']}" for ach in saved_achievements if isinstance(ach, dict) and "text" in ach]
+        [f"• {ach['title']}" for ach in saved_achievements]
     ) if saved_achievements else "No achievements added yet."
 
     if st.button("📜 Generate Resume"):
@@ -132,10 +133,12 @@ elif page == "🎟 Event Recommendations":
 
     if st.button("🔍 Get Recommendations"):
         if interests.strip():
-            recommended_events = recommend_events(interests)
+            recommended_events = recommend_events(interests, username=st.session_state.username)
             if recommended_events:
                 for event in recommended_events:
-                    st.write(f"📍 {event}")
+                    st.write(f"📍 **{event['title']}** ({event['category']})")
+                    if event.get("description"):
+                        st.caption(event["description"])
             else:
                 st.warning("⚠ No matching events found.")
         else:
@@ -146,21 +149,52 @@ elif page == "🏠 Home":
     st.header("🎉 Upload Certificates")
     uploaded_file = st.file_uploader("📂 Upload a certificate", type=["jpg", "png", "pdf"])
 
+    if "ocr_jobs" not in st.session_state:
+        st.session_state.ocr_jobs = {}  # Uploaded file id -> background OCR job id
+
     if uploaded_file:
-        extracted_texts = []
         try:
             if uploaded_file.type.startswith("image/"):
                 image = Image.open(uploaded_file)
+                image.load()  # Decode now so the OCR worker never reads the upload buffer
                 st.image(image, caption="🖼 Uploaded Certificate", use_container_width=True)
-                extracted_texts.append(extract_text_from_image(image))
+                # ⏳ Queue OCR once per upload; reruns keep polling the same job
+                if uploaded_file.file_id not in st.session_state.ocr_jobs:
+                    st.session_state.ocr_jobs[uploaded_file.file_id] = submit_ocr_job(st.session_state.username, [image])
 
             elif uploaded_file.type == "application/pdf":
-                images = extract_images_from_pdf(uploaded_file)
-                for idx, image in enumerate(images):
-                    st.image(image, caption=f"📄 Page {idx + 1}", use_container_width=True)
-                    extracted_texts.append(extract_text_from_image(image))
-
-            st.experimental_rerun()
+                pdf_bytes = uploaded_file.getvalue()
+                for idx, page_image in enumerate(iter_pdf_previews(pdf_bytes)):
+                    st.image(page_image, caption=f"📄 Page {idx + 1}", use_container_width=True)
+                # 📄 Digital pages use their text layer; only scanned pages are OCR'd
+                if uploaded_file.file_id not in st.session_state.ocr_jobs:
+                    st.session_state.ocr_jobs[uploaded_file.file_id] = submit_pdf_ocr_job(st.session_state.username, pdf_bytes)
 
         except Exception as e:
             st.error(f"⚠ Error processing file: {e}")
+
+    # 🔄 Poll background OCR jobs without blocking the rest of the page, only while one is unfinished
+    polling = any(job is not None and job["status"] in ("queued", "running")
+                  for job in map(get_job, st.session_state.ocr_jobs.values()))
+
+    @st.fragment(run_every=2 if polling else None)
+    def show_ocr_progress():
+        active = False
+        for job_id in st.session_state.ocr_jobs.values():
+            job = get_job(job_id)
+            if job is None:
+                continue
+            if job["status"] == "failed":
+                st.error(f"⚠ Error extracting text: {job['error']}")
+            elif job["status"] == "done":
+                message = f"✅ Extracted text from {job['total']} page(s): {job['saved']} saved to your achievements"
+                if job["duplicates"]:
+                    message += f", {job['duplicates']} skipped as already saved"
+                st.success(message + ".")
+            else:
+                active = True
+                st.progress(job["progress"], text=f"🔍 Extracting text... {job['done']}/{job['total']}")
+        if polling and not active:
+            st.rerun()  # Last job finished: rerun the page once so the fragment stops polling
+
+    show_ocr_progress()
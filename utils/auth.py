@@ -1,6 +1,249 @@
+import base64
+import hashlib
+import hmac
 import json
+import os
+import secrets
+import threading
+import time
+from utils.database import file_lock, write_atomic
+from utils.rate_limit import TokenBucketLimiter
 
-def authenticate_user(username, password):
-    with open("data/users.json", "r") as f:
-        users = json.load(f)
-    return username in users and users[username] == password
+USERS_FILE = "data/users.json"
+
+# 🔑 Password hashes are stored as "pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>"
+PASSWORD_HASH_ITERATIONS = 200_000
+_HASH_SCHEME = "pbkdf2_sha256"
+
+# 🚦 Login throttling, applied before any password hashing so floods stay cheap.
+# The account bucket is keyed by (username, client) and only failed attempts use it up, so
+# nobody can lock a student out from another network. The trade-off: guesses spread over many
+# IPs are only slowed by the per-client bucket and the hash cost; "python -m utils.auth attack"
+# measures both.
+LOGIN_USER_BURST = 5  # Failed attempts per username and client before throttling...
+LOGIN_USER_RATE = 1 / 30  # ...then one more every 30 seconds
+LOGIN_CLIENT_BURST = 20  # Attempts per client (IP) before throttling...
+LOGIN_CLIENT_RATE = 1.0  # ...then one more per second
+user_limiter = TokenBucketLimiter(LOGIN_USER_BURST, LOGIN_USER_RATE)
+client_limiter = TokenBucketLimiter(LOGIN_CLIENT_BURST, LOGIN_CLIENT_RATE)
+rate_limit_stats = {"allowed": 0, "rejected_client": 0, "rejected_username": 0}
+_stats_lock = threading.Lock()
+
+# Reverse proxies in front of the app that append to X-Forwarded-For; the client address is the
+# entry the outermost of them added (anything further left is whatever the client sent)
+TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", 1))
+
+class LoginRateLimited(Exception):
+    """Raised by authenticate_user when a username or client has made too many attempts."""
+
+# 🎫 Signed session tokens: "<username b64>.<expiry>.<signature b64>", checked without touching disk.
+# Set SESSION_SECRET so tokens survive restarts and are shared by all app processes.
+SESSION_SECRET = os.environ.get("SESSION_SECRET", "").encode("utf-8") or secrets.token_bytes(32)
+SESSION_TTL = int(os.environ.get("SESSION_TTL", 12 * 3600))  # Seconds a token stays valid
+
+# 🧠 Users loaded once and reloaded only when the file's mtime/size change
+_users = {}
+_users_version = None
+_users_lock = threading.Lock()
+
+def hash_password(password, salt=None, iterations=PASSWORD_HASH_ITERATIONS):
+    """Return a salted PBKDF2-SHA256 hash string for a password."""
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{_HASH_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+def verify_password(password, stored):
+    """Check a password against a stored hash (or a not-yet-migrated plaintext password)."""
+    if not is_hashed(stored):
+        verify_password(password, _DUMMY_HASH)  # Same cost as a real hash, so timing doesn't reveal plaintext accounts
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    try:
+        _, iterations, salt, expected = stored.split("$")
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+    except ValueError:  # Malformed stored hash
+        return False
+    return hmac.compare_digest(digest.hex(), expected)
+
+def is_hashed(stored):
+    """True for stored values in the hash format, False for not-yet-migrated plaintext."""
+    return stored.startswith(f"{_HASH_SCHEME}$")
+
+def _upgrade_plaintext_password(username, password):
+    """Replace a user's plaintext password with a hash after they logged in with it."""
+    with file_lock(USERS_FILE):
+        with open(USERS_FILE, "r") as f:
+            users = json.load(f)
+        if users.get(username) == password:  # Unchanged since we checked it
+            users[username] = hash_password(password)
+            write_atomic(USERS_FILE, users)
+
+def load_users():
+    """Return the username -> password hash dict, re-reading USERS_FILE only if it changed."""
+    global _users, _users_version
+    stat = os.stat(USERS_FILE)
+    version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if version != _users_version:
+        with _users_lock:
+            if version != _users_version:
+                with open(USERS_FILE, "r") as f:
+                    _users = json.load(f)
+                _users_version = version
+    return _users
+
+# Verifying against this for unknown usernames keeps their response time the same as a wrong password
+_DUMMY_HASH = hash_password(secrets.token_hex(8))
+
+def _count(outcome):
+    with _stats_lock:
+        rate_limit_stats[outcome] += 1
+
+def client_address(forwarded_for, trusted_proxies=None):
+    """
+    The client IP from an X-Forwarded-For header, counting trusted_proxies (default
+    TRUSTED_PROXY_COUNT) hops from the right. None if it can't be determined.
+    """
+    trusted_proxies = TRUSTED_PROXY_COUNT if trusted_proxies is None else trusted_proxies
+    hops = [hop.strip() for hop in (forwarded_for or "").split(",") if hop.strip()]
+    if trusted_proxies < 1 or len(hops) < trusted_proxies:
+        return None
+    return hops[-trusted_proxies]
+
+def authenticate_user(username, password, client_id=None):
+    """
+    Check a username/password pair. Raises LoginRateLimited (without hashing anything)
+    if the client, or this client's failed attempts at the username, are over the limit.
+    """
+    if client_id is not None and not client_limiter.consume(client_id):
+        _count("rejected_client")
+        raise LoginRateLimited("Too many login attempts from your network. Please wait a moment and try again.")
+    account_key = (username, client_id)
+    if not user_limiter.consume(account_key):
+        _count("rejected_username")
+        raise LoginRateLimited("Too many login attempts for this account. Please wait a minute and try again.")
+    _count("allowed")
+    stored = load_users().get(username)
+    if stored is None:
+        verify_password(password, _DUMMY_HASH)
+        return False
+    if not verify_password(password, stored):
+        return False
+    user_limiter.refund(account_key)  # Only failed attempts count against the account
+    if not is_hashed(stored):
+        _upgrade_plaintext_password(username, password)
+    return True
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(payload):
+    return _b64(hmac.new(SESSION_SECRET, payload.encode("ascii"), hashlib.sha256).digest())
+
+def issue_session_token(username, ttl=None):
+    """Return a signed token proving username logged in, valid for ttl (default SESSION_TTL) seconds."""
+    expires = int(time.time()) + (SESSION_TTL if ttl is None else ttl)
+    payload = f"{_b64(username.encode('utf-8'))}.{expires}"
+    return f"{payload}.{_sign(payload)}"
+
+def verify_session_token(token):
+    """Return the username a session token was issued to, or None if it is malformed, forged or expired."""
+    try:
+        encoded_username, expires, signature = (token or "").split(".")
+        payload = f"{encoded_username}.{expires}"
+        # Compare bytes: compare_digest raises TypeError on non-ASCII str (the token comes from the URL)
+        if not hmac.compare_digest(signature.encode("ascii"), _sign(payload).encode("ascii")) or int(expires) < time.time():
+            return None
+        return _unb64(encoded_username).decode("utf-8")
+    except (ValueError, UnicodeError):
+        return None
+
+def migrate_plaintext_passwords():
+    """One-off migration: replace plaintext passwords in USERS_FILE with salted hashes. Returns how many changed."""
+    with file_lock(USERS_FILE):
+        with open(USERS_FILE, "r") as f:
+            users = json.load(f)
+        plaintext = [name for name, stored in users.items() if not is_hashed(stored)]
+        for name in plaintext:
+            users[name] = hash_password(users[name])
+        if plaintext:
+            write_atomic(USERS_FILE, users)
+    return len(plaintext)
+
+# ✅ Maintenance (Optional): python -m utils.auth migrate | bench | attack
+if __name__ == "__main__":
+    import statistics
+    import sys
+    import tempfile
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if command == "migrate":
+        print(f"🔑 Hashed {migrate_plaintext_passwords()} plaintext password(s) in {USERS_FILE}.")
+    elif command == "bench":
+        # ⏱ Login throughput: cached user lookup + one hash per attempt
+        logins = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+        username, stored = next(iter(load_users().items()))
+        start = time.perf_counter()
+        for i in range(logins):
+            authenticate_user(username, "wrong password", client_id=f"bench-{i}")  # Fresh client: not throttled
+        elapsed = time.perf_counter() - start
+        kind = "hashed" if is_hashed(stored) else "plaintext"
+        print(f"{logins} logins ({kind} store) in {elapsed:.2f}s: {logins / elapsed:.0f} logins/s per core")
+    elif command == "attack":
+        # ⏱ Load test: legit login latency alone vs during a credential-stuffing burst
+        def legit_latencies(count):
+            latencies = []
+            for i in range(count):
+                start = time.perf_counter()
+                authenticate_user(f"student{time.monotonic_ns()}-{i}", "password", client_id=f"campus-{i}")
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        def attacker(stop):
+            while not stop.is_set():
+                try:
+                    authenticate_user("yogavarshini", secrets.token_hex(4), client_id="203.0.113.7")
+                except LoginRateLimited:
+                    pass
+                time.sleep(0.001)  # ~1000 attempts/s per attacker; an unpaced loop would just measure GIL contention
+
+        baseline = legit_latencies(20)
+        stop = threading.Event()
+        attackers = [threading.Thread(target=attacker, args=(stop,)) for _ in range(4)]
+        for thread in attackers:
+            thread.start()
+        under_attack = legit_latencies(20)
+        stop.set()
+        for thread in attackers:
+            thread.join()
+        print(f"Legit login median: {statistics.median(baseline) * 1e3:.0f} ms alone, "
+              f"{statistics.median(under_attack) * 1e3:.0f} ms under attack; limiter stats: {rate_limit_stats}")
+
+        # 🎯 Targeted lockout: a botnet (a fresh IP per attempt) keeps guessing one account's password
+        # while its owner logs in with the right one (from a throwaway users file)
+        USERS_FILE = os.path.join(tempfile.mkdtemp(), "users.json")
+        write_atomic(USERS_FILE, {"varshini": hash_password("victim's password")})
+
+        def botnet(stop):
+            while not stop.is_set():
+                try:
+                    authenticate_user("varshini", secrets.token_hex(4), client_id=secrets.token_hex(4))
+                except LoginRateLimited:
+                    pass
+                time.sleep(0.01)
+
+        stop = threading.Event()
+        bots = threading.Thread(target=botnet, args=(stop,))
+        bots.start()
+        throttled = 0
+        for _ in range(10):
+            time.sleep(0.5)
+            try:
+                authenticate_user("varshini", "victim's password", client_id="campus-victim")
+            except LoginRateLimited:
+                throttled += 1
+        stop.set()
+        bots.join()
+        print(f"Targeted account: {throttled}/10 of the owner's login attempts were throttled over 5 s; "
+              f"limiter stats: {rate_limit_stats}")
@@ -0,0 +1,165 @@
+import functools
+import hashlib
+import os
+import struct
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # Optional: fall back to the stdlib's zlib
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+# 📦 Content-addressed store for large text payloads (raw OCR output), kept out of the metadata index.
+# Blobs are appended to one pack file: a file per blob would round every few-KB blob up to a
+# whole disk block, so compression would save neither disk nor page cache.
+BLOBS_DIR = "achievement_blobs"
+_RECORD_HEADER = struct.Struct(">32sI")  # SHA-256 digest, payload length
+
+# 🗜 Codec for new blobs: "zstd" (if zstandard is installed), "zlib" or "none".
+# Each blob starts with a codec byte, so blobs written with any codec stay readable.
+BLOB_CODEC = os.environ.get("BLOB_CODEC", "zstd" if zstandard is not None else "zlib")
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+_CODEC_BYTES = {"none": b"\x00", "zlib": b"\x01", "zstd": b"\x02"}
+
+_pack_lock = threading.Lock()
+_pack_index = {}  # blob id -> (payload offset, payload length)
+_pack_indexed_size = 0  # Bytes of the pack already scanned into _pack_index
+
+def _pack_path():
+    return os.path.join(BLOBS_DIR, "blobs.pack")
+
+def _scan_pack(file):
+    """Index records appended since the last scan (possibly by other processes). Call with _pack_lock held."""
+    global _pack_indexed_size
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    offset = _pack_indexed_size
+    while offset + _RECORD_HEADER.size <= size:
+        file.seek(offset)
+        digest, length = _RECORD_HEADER.unpack(file.read(_RECORD_HEADER.size))
+        if offset + _RECORD_HEADER.size + length > size:
+            break  # Torn record from a crash mid-append
+        _pack_index[digest.hex()] = (offset + _RECORD_HEADER.size, length)
+        offset += _RECORD_HEADER.size + length
+    _pack_indexed_size = offset
+
+def compress(data, codec=None):
+    """Compress bytes with the given (or configured) codec, prefixed with its codec byte."""
+    codec = codec or BLOB_CODEC
+    if codec == "zstd" and zstandard is None:
+        codec = "zlib"
+    if codec == "zstd":
+        payload = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    elif codec == "zlib":
+        payload = zlib.compress(data, ZLIB_LEVEL)
+    else:
+        payload = data
+    return _CODEC_BYTES[codec] + payload
+
+def decompress(blob):
+    """Reverse compress()."""
+    codec, payload = blob[:1], blob[1:]
+    if codec == _CODEC_BYTES["zstd"]:
+        if zstandard is None:
+            raise RuntimeError("This blob is zstd-compressed; install the 'zstandard' package to read it.")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if codec == _CODEC_BYTES["zlib"]:
+        return zlib.decompress(payload)
+    if codec == _CODEC_BYTES["none"]:
+        return payload
+    raise ValueError(f"Unknown blob codec byte {codec!r}")
+
+def write_blob(text, codec=None):
+    """Store text compressed under the SHA-256 of its content and return the blob id. Identical texts share a blob."""
+    data = text.encode("utf-8")
+    digest = hashlib.sha256(data).digest()
+    blob_id = digest.hex()
+    with _pack_lock:
+        if blob_id in _pack_index:
+            return blob_id
+        os.makedirs(BLOBS_DIR, exist_ok=True)
+        with open(_pack_path(), "a+b") as file:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_EX)  # Other processes append to the same pack
+            _scan_pack(file)
+            if blob_id in _pack_index:  # Another process stored it meanwhile
+                return blob_id
+            file.truncate(_pack_indexed_size)  # Drop a torn tail so the new record stays aligned
+            payload = compress(data, codec)
+            file.write(_RECORD_HEADER.pack(digest, len(payload)) + payload)
+            file.flush()
+            os.fsync(file.fileno())
+            _scan_pack(file)
+    return blob_id
+
+@functools.lru_cache(maxsize=256)  # Blobs never change, so cached reads can't go stale
+def read_blob(blob_id):
+    """Load and decompress a blob's text. Raises KeyError for an unknown blob id."""
+    with _pack_lock:
+        location = _pack_index.get(blob_id)
+        if location is None and os.path.exists(_pack_path()):
+            with open(_pack_path(), "rb") as file:
+                _scan_pack(file)
+            location = _pack_index.get(blob_id)
+    if location is None:
+        raise KeyError(blob_id)
+    offset, length = location
+    with open(_pack_path(), "rb") as file:
+        file.seek(offset)
+        return decompress(file.read(length)).decode("utf-8")
+
+# ✅ Compression benchmark (Optional): python -m utils.blobs [users]
+if __name__ == "__main__":
+    import random
+    import sys
+    import tempfile
+    import time
+
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(0)
+    words = ("certificate participation awarded hackathon smart india ministry education government "
+             "innovation cell secretary department institute technology workshop conference winner "
+             "appreciation completion internship chennai metro rail limited project").split()
+
+    def synthetic_ocr_text():
+        # OCR-like dump: a certificate template with a name, event and scattered noise lines
+        lines = [rng.choice(words).upper() for _ in range(rng.randint(5, 15))]
+        lines += [" ".join(rng.choice(words) for _ in range(rng.randint(3, 12))) for _ in range(rng.randint(10, 40))]
+        lines += ["".join(rng.choice("~!@#%&*()_+=-") for _ in range(rng.randint(1, 6))) for _ in range(rng.randint(5, 20))]
+        rng.shuffle(lines)
+        return "\n".join(lines)
+
+    texts = [synthetic_ocr_text() for _ in range(users)]
+    raw_bytes = sum(len(text.encode("utf-8")) for text in texts)
+    print(f"{users} users, {raw_bytes / 1e6:.1f} MB of raw OCR text")
+    for codec in ("none", "zlib", "zstd"):
+        if codec == "zstd" and zstandard is None:
+            print("zstd: skipped (zstandard not installed)")
+            continue
+        BLOBS_DIR = tempfile.mkdtemp(prefix=f"blobs-{codec}-")
+        _pack_index.clear()
+        _pack_indexed_size = 0
+        start = time.perf_counter()
+        blob_ids = [write_blob(text, codec) for text in texts]
+        write_time = time.perf_counter() - start
+        read_blob.cache_clear()
+        start = time.perf_counter()
+        for blob_id in blob_ids:
+            read_blob.__wrapped__(blob_id)  # Bypass the LRU cache: measure disk read + decompress
+        read_time = time.perf_counter() - start
+        apparent = allocated = 0
+        for root, _, files in os.walk(BLOBS_DIR):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                apparent += stat.st_size
+                allocated += stat.st_blocks * 512
+        print(f"{codec}: {apparent / 1e6:.1f} MB ({apparent / raw_bytes:.0%} of raw), {allocated / 1e6:.1f} MB on disk, "
+              f"write {write_time / users * 1e3:.3f} ms/blob, read {read_time / users * 1e3:.3f} ms/blob")
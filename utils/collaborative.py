@@ -0,0 +1,112 @@
+import heapq
+import threading
+from utils import database
+
+# 🤝 Item-item collaborative filtering over event ratings ({username: {event title: rating}}).
+# The sparse item x item matrix of rating dot products is updated per saved rating, and each
+# event's most similar events are precomputed, so scoring a user only walks their own ratings.
+# Ratings saved by other processes (or edits to the ratings file) trigger a background rebuild.
+CF_NEIGHBOURS = 20  # Most similar events kept per event
+CF_MIN_SIMILARITY = 0.05  # Cosine similarity below which two events aren't neighbours
+CF_MAX_RATING = 5.0
+
+_lock = threading.Lock()  # Guards updates to the model below
+_rebuild_lock = threading.Lock()  # Held while a (re)build runs
+_user_ratings = None  # username -> {title: rating} as folded into the model; None until first built
+_dots = {}  # title -> {other title: sum over users of rating(title) * rating(other)}
+_neighbours = {}  # title -> [(cosine similarity, other title)], best first
+_version = None  # database.ratings_version() the model was built from
+
+def _clean(rating):
+    """Keep positive numeric ratings: {title: float}."""
+    if not isinstance(rating, dict):
+        return {}
+    return {title: float(value) for title, value in rating.items() if isinstance(value, (int, float)) and value > 0}
+
+def _fold(dots, old, new):
+    """Move one user's contribution to the dot products from old to new ratings. Returns the events touched."""
+    for vector, sign in ((old, -1), (new, 1)):
+        for title, rating in vector.items():
+            row = dots.setdefault(title, {})
+            for other, other_rating in vector.items():
+                row[other] = row.get(other, 0.0) + sign * rating * other_rating
+    return old.keys() | new.keys()
+
+def _refresh(dots, neighbours, titles):
+    """
+    Recompute the neighbour lists of the given events and of every event co-rated with them
+    (their similarities to the given events change with those events' norms).
+    """
+    affected = set(titles)
+    for title in titles:
+        affected.update(dots.get(title, ()))
+    for title in affected:
+        row = dots.get(title, {})
+        norm = max(row.get(title, 0.0), 0.0) ** 0.5  # Removals can leave float residue just below zero
+        similarities = []
+        for other, dot in row.items():
+            if other != title and dot > 1e-9 and norm > 1e-9:
+                similarity = dot / (norm * max(dots[other][other], 1e-18) ** 0.5)
+                if similarity >= CF_MIN_SIMILARITY:
+                    similarities.append((similarity, other))
+        neighbours[title] = heapq.nlargest(CF_NEIGHBOURS, similarities)
+
+def _rebuild():
+    """Build the model from all stored ratings and swap it in. Call with _rebuild_lock held."""
+    global _user_ratings, _dots, _neighbours, _version
+    version = database.ratings_version()  # Read first: a save during the build triggers another rebuild
+    ratings = {username: _clean(rating) for username, rating in database.get_ratings().items()}
+    dots, neighbours, touched = {}, {}, set()
+    for rating in ratings.values():
+        touched |= _fold(dots, {}, rating)
+    _refresh(dots, neighbours, touched)
+    with _lock:
+        _user_ratings, _dots, _neighbours, _version = ratings, dots, neighbours, version
+
+def _rebuild_in_background():
+    global _version
+    try:
+        _rebuild()
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Keeping the previous ratings model; could not rebuild it: {e}")
+        _version = database.ratings_version()  # Don't retry until the ratings change again
+    finally:
+        _rebuild_lock.release()
+
+def _ensure_built():
+    """
+    Build the model from all stored ratings on first use. After that, a change to the stored
+    ratings is picked up by a background rebuild while requests keep using the current model.
+    """
+    if _user_ratings is None:
+        with _rebuild_lock:
+            if _user_ratings is None:
+                _rebuild()
+    elif _version != database.ratings_version() and _rebuild_lock.acquire(blocking=False):
+        threading.Thread(target=_rebuild_in_background, daemon=True).start()  # Releases the lock when done
+
+def on_rating_saved(username, rating):
+    """database.save_rating listener: fold one user's new ratings into the model instead of rebuilding it."""
+    with _lock:
+        if _user_ratings is None:
+            return  # Not built yet; the first build reads everything
+        new = _clean(rating)
+        _refresh(_dots, _neighbours, _fold(_dots, _user_ratings.get(username, {}), new))
+        _user_ratings[username] = new
+
+database.rating_listeners.append(on_rating_saved)
+
+def user_ratings(username):
+    """The user's ratings as the model sees them."""
+    _ensure_built()
+    return _user_ratings.get(username, {})
+
+def recommend_for_user(username):
+    """Return {title: score} for events similar to those the user rated, excluding the rated ones."""
+    rated = user_ratings(username)
+    scores = {}
+    for title, rating in rated.items():
+        for similarity, other in _neighbours.get(title, ()):
+            if other not in rated:
+                scores[other] = scores.get(other, 0.0) + similarity * rating / CF_MAX_RATING
+    return scores
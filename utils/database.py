@@ -1,56 +1,574 @@
+import contextlib
+import datetime
 import json
 import os
+import sqlite3
 import threading
+import time
+import uuid
+from utils.blobs import BLOBS_DIR, read_blob, write_blob
+from utils.fingerprint import find_duplicate, minhash_signature, number_tokens, text_fingerprint
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
 
 # Define file paths
 ACHIEVEMENTS_FILE = "achievements.json"
-RATINGS_FILE = "ratings.json"
+RATINGS_FILE = "data/ratings.json"
+DATABASE_FILE = "portfolio.db"
+
+# 🗄 Storage backend: "json" (the files above), "journal" (JSON snapshot + append-only log)
+# or "sqlite" (DATABASE_FILE, indexed by username)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+
+# 📒 Journal backend: writes append one line to <file>.journal, folded into the snapshot every N records
+JOURNAL_COMPACT_RECORDS = 1000
+JOURNAL_FSYNC = os.environ.get("JOURNAL_FSYNC", "always")  # "always", "interval" or "never"
+JOURNAL_FSYNC_INTERVAL = 1.0  # Seconds between fsyncs in "interval" mode
+_journal_state = {}  # filename -> {"records": lines in the journal, "last_fsync": timestamp}
+
+# 🔔 Called as listener(username, rating) after each save_rating, e.g. to update the recommender's model
+rating_listeners = []
+
+# Guards the shared in-memory caches below; only ever held briefly, never while waiting on a file lock
+lock = threading.RLock()
+
+# 🔐 Per-file locks: an in-process RLock (re-entrant so journal helpers can nest), then an
+# advisory fcntl lock on <file>.lock for other processes. Writers of one file never block
+# readers or writers of another.
+_file_locks = {}  # filename -> threading.RLock
+_lock_files = {}  # filename -> open lock file
+_lock_depth = {}  # filename -> nesting depth in this process
+
+# 🧠 Parsed JSON kept in memory, reused while the file's mtime/size are unchanged
+_read_cache = {}  # filename -> ((mtime_ns, size), data)
+read_cache_stats = {"hits": 0, "misses": 0}
+
+# One SQLite connection per thread (connections must not be shared across threads)
+_local = threading.local()
 
-# Lock to prevent concurrent write issues
-lock = threading.Lock()
+# 📇 Achievement index columns (raw OCR text lives in a blob, see utils/blobs.py)
+_SQLITE_INDEX_COLUMNS = "id, category, title, date, fingerprint, minhash, numbers, blob, CASE WHEN blob IS NULL THEN details END"
+TITLE_MAX_CHARS = 80
 
-def save_achievement(username, category, details):
-    """Save an achievement for a user."""
-    data = load_data(ACHIEVEMENTS_FILE)
-    if username not in data:
-        data[username] = []
-    data[username].append({"category": category, "details": details})
-    save_data(data, ACHIEVEMENTS_FILE)
+def derive_title(details):
+    """Use the first line with real words as a title, e.g. the certificate heading."""
+    for line in (details or "").splitlines():
+        line = line.strip()
+        if sum(char.isalpha() for char in line) >= 4:
+            return line[:TITLE_MAX_CHARS]
+    return "Untitled achievement"
+
+def save_achievement(username, category, details, title=None):
+    """
+    Save an achievement for a user, unless it duplicates (exactly or nearly) one they already have.
+    The raw details go to the blob store; the index keeps category, title, date and fingerprints.
+    Returns True if it was saved, False if it was a duplicate.
+    """
+    record = {
+        "id": uuid.uuid4().hex,
+        "category": category,
+        "title": title or derive_title(details),
+        "date": datetime.date.today().isoformat(),
+        "fingerprint": text_fingerprint(details),
+        "minhash": minhash_signature(details),
+        "numbers": number_tokens(details),
+    }
+    if STORAGE_BACKEND == "sqlite":
+        conn = get_connection()
+        conn.execute("BEGIN IMMEDIATE")  # Check and insert atomically across processes
+        try:
+            saved = find_duplicate(record, _sqlite_index(conn, username)) is None
+            if saved:
+                conn.execute(
+                    "INSERT INTO achievements (username, category, title, date, fingerprint, minhash, numbers, blob) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (username, category, record["title"], record["date"], record["fingerprint"],
+                     json.dumps(record["minhash"]), json.dumps(record["numbers"]), write_blob(details)),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return saved
+    with file_lock(ACHIEVEMENTS_FILE):  # Read-check-write must not interleave with other processes
+        data = load_data(ACHIEVEMENTS_FILE)
+        if find_duplicate(record, data.get(username, [])) is not None:
+            return False
+        record["blob"] = write_blob(details)
+        if STORAGE_BACKEND == "journal":
+            append_journal(ACHIEVEMENTS_FILE, {"op": "append", "key": username, "value": record})
+        else:
+            data = dict(data)  # Cached data is shared: copy what we change
+            data[username] = data.get(username, []) + [record]
+            save_data(data, ACHIEVEMENTS_FILE)
+    return True
+
+def _sqlite_index(conn, username=None):
+    """Index rows as records; legacy rows without a blob carry their inline details instead."""
+    query = f"SELECT {_SQLITE_INDEX_COLUMNS}, username FROM achievements"
+    rows = conn.execute(query + " WHERE username = ? ORDER BY id", (username,)) if username is not None \
+        else conn.execute(query + " ORDER BY username, id")
+    records = []
+    for row_id, category, title, date, fingerprint, minhash, numbers, blob, details, row_username in rows:
+        record = {"id": row_id, "username": row_username, "category": category, "title": title, "date": date,
+                  "fingerprint": fingerprint, "minhash": json.loads(minhash or "null"),
+                  "numbers": json.loads(numbers or "null"), "blob": blob}
+        if blob is None:
+            record["details"] = details
+            record["title"] = title or derive_title(details)
+        records.append(record)
+    return records
+
+def list_achievements(username):
+    """Retrieve a user's achievement metadata (id, category, title, date) without loading the raw text."""
+    if STORAGE_BACKEND == "sqlite":
+        return _sqlite_index(get_connection(), username)
+    return [
+        record if "title" in record else dict(record, title=derive_title(record.get("details")))
+        for record in load_data(ACHIEVEMENTS_FILE).get(username, [])
+        if isinstance(record, dict)
+    ]
+
+def list_all_achievements():
+    """Achievement metadata of every user, as {username: records} (see list_achievements)."""
+    if STORAGE_BACKEND == "sqlite":
+        grouped = {}
+        for record in _sqlite_index(get_connection()):
+            grouped.setdefault(record["username"], []).append(record)
+        return grouped
+    return {username: list_achievements(username) for username in load_data(ACHIEVEMENTS_FILE)}
+
+def get_achievement_details(record):
+    """Load the raw text of one achievement returned by list_achievements (records saved inline return it directly)."""
+    if record.get("blob") is None:
+        return record.get("details")
+    return read_blob(record["blob"])
 
 def get_achievements(username):
-    """Retrieve achievements of a user."""
-    data = load_data(ACHIEVEMENTS_FILE)
-    return data.get(username, [])
+    """Retrieve achievements of a user, with their full details."""
+    return [dict(record, details=get_achievement_details(record)) for record in list_achievements(username)]
+
+def _rewrite_achievements(transform):
+    """
+    Rewrite every achievement record through transform(username, record, kept) -> record or None (drop),
+    in the configured store. Returns the number of records dropped.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        conn = get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            kept, removed = {}, []
+            for record in _sqlite_index(conn):
+                new_record = transform(record["username"], record, kept.setdefault(record["username"], []))
+                if new_record is None:
+                    removed.append((record["id"],))
+                    continue
+                kept[record["username"]].append(new_record)
+                conn.execute(
+                    "UPDATE achievements SET title = ?, fingerprint = ?, minhash = ?, numbers = ?, blob = ?, details = ? "
+                    "WHERE id = ?",
+                    (new_record["title"], new_record["fingerprint"], json.dumps(new_record["minhash"]),
+                     json.dumps(new_record.get("numbers")), new_record.get("blob"), new_record.get("details"), record["id"]),
+                )
+            conn.executemany("DELETE FROM achievements WHERE id = ?", removed)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(removed)
+
+    with file_lock(ACHIEVEMENTS_FILE):
+        data, removed = {}, 0
+        for username, records in load_data(ACHIEVEMENTS_FILE).items():
+            data[username] = []
+            for record in records:
+                if not isinstance(record, dict):
+                    continue
+                record = transform(username, dict(record, id=record.get("id") or uuid.uuid4().hex), data[username])
+                if record is None:
+                    removed += 1
+                else:
+                    data[username].append(record)
+        if STORAGE_BACKEND == "journal":
+            compact_journal(ACHIEVEMENTS_FILE, data)
+        else:
+            save_data(data, ACHIEVEMENTS_FILE)
+    return removed
+
+def _with_fingerprints(record):
+    details = get_achievement_details(record)
+    return dict(record, title=record.get("title") or derive_title(details),
+                fingerprint=text_fingerprint(details), minhash=minhash_signature(details), numbers=number_tokens(details))
+
+def dedupe_achievements():
+    """
+    One-off compaction: drop duplicate achievements (keeping the first of each group)
+    and backfill ids and fingerprints on the rest. Returns the number of records removed.
+    """
+    def transform(username, record, kept):
+        record = _with_fingerprints(record)
+        return None if find_duplicate(record, kept) is not None else record
+    return _rewrite_achievements(transform)
+
+def split_achievement_blobs():
+    """One-off migration: move inline details of older records into the blob store, leaving only metadata in the index."""
+    def transform(username, record, kept):
+        if record.get("blob") is None:
+            record = _with_fingerprints(record)
+            record["blob"] = write_blob(record.pop("details", None) or "")
+        return record
+    return _rewrite_achievements(transform)
 
 def save_rating(username, rating):
     """Save a rating given by a user."""
-    data = load_data(RATINGS_FILE)
-    data[username] = rating
-    save_data(data, RATINGS_FILE)
+    if STORAGE_BACKEND == "sqlite":
+        conn = get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO ratings (username, rating) VALUES (?, ?)", (username, json.dumps(rating)))
+            conn.execute("INSERT INTO meta (key, value) VALUES ('ratings_version', 1) "
+                         "ON CONFLICT (key) DO UPDATE SET value = value + 1")  # See ratings_version()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    elif STORAGE_BACKEND == "journal":
+        append_journal(RATINGS_FILE, {"op": "set", "key": username, "value": rating})
+    else:
+        with file_lock(RATINGS_FILE):
+            data = dict(load_data(RATINGS_FILE))
+            data[username] = rating
+            save_data(data, RATINGS_FILE)
+    for listener in rating_listeners:
+        listener(username, rating)
 
 def get_ratings():
     """Retrieve all ratings."""
-    return load_data(RATINGS_FILE)
+    if STORAGE_BACKEND == "sqlite":
+        rows = get_connection().execute("SELECT username, rating FROM ratings")
+        return {username: json.loads(rating) for username, rating in rows}
+    return dict(load_data(RATINGS_FILE))
+
+def ratings_version():
+    """A value that changes whenever ratings are saved, by any process (or the file is edited)."""
+    if STORAGE_BACKEND == "sqlite":
+        row = get_connection().execute("SELECT value FROM meta WHERE key = 'ratings_version'").fetchone()
+        return row and row[0]
+    filenames = [RATINGS_FILE, _journal_file(RATINGS_FILE)] if STORAGE_BACKEND == "journal" else [RATINGS_FILE]
+    versions = []
+    for filename in filenames:
+        try:
+            versions.append(_file_version(filename))
+        except FileNotFoundError:
+            versions.append(None)
+    return tuple(versions)
+
+def get_connection():
+    """Return this thread's SQLite connection, creating the schema (and migrating JSON data) on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DATABASE_FILE, timeout=30, isolation_level=None)  # Autocommit per statement
+        conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS achievements (
+                id INTEGER PRIMARY KEY,
+                username TEXT NOT NULL,
+                category TEXT,
+                details TEXT,
+                fingerprint TEXT,
+                minhash TEXT,
+                numbers TEXT,
+                title TEXT,
+                date TEXT,
+                blob TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_achievements_username ON achievements (username);
+            CREATE TABLE IF NOT EXISTS ratings (username TEXT PRIMARY KEY, rating TEXT);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        migrate_json_to_sqlite(conn)
+        _local.conn = conn
+    return conn
+
+def migrate_json_to_sqlite(conn):
+    """One-shot import of the JSON files into SQLite; later calls (from any process) are no-ops."""
+    conn.execute("BEGIN IMMEDIATE")  # Take the write lock so only one process migrates
+    try:
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone() is None:
+            achievements = _read_json(ACHIEVEMENTS_FILE)
+            conn.executemany(
+                "INSERT INTO achievements (username, category, details, fingerprint, minhash, numbers, title, date, blob) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (username, record.get("category"), record.get("details"), record.get("fingerprint"),
+                     json.dumps(record.get("minhash")), json.dumps(record.get("numbers")), record.get("title"),
+                     record.get("date"), record.get("blob"))
+                    for username, records in achievements.items()
+                    for record in records
+                    if isinstance(record, dict)
+                ],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO ratings (username, rating) VALUES (?, ?)",
+                [(username, json.dumps(rating)) for username, rating in _read_json(RATINGS_FILE).items()],
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', '1')")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _read_json(filename):
+    """Read a JSON file without creating or resetting it (used for migration)."""
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {}
+
+def get_read_cache_stats():
+    """Return read cache hits, misses and hit rate for the JSON backend."""
+    with lock:
+        stats = dict(read_cache_stats)
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
+
+@contextlib.contextmanager
+def file_lock(filename):
+    """
+    Hold the file's in-process lock plus an exclusive fcntl lock on <filename>.lock, so writers
+    in other processes (e.g. several Streamlit workers on one host) are serialised too.
+    Re-entrant within a thread.
+    """
+    with lock:
+        process_lock = _file_locks.setdefault(filename, threading.RLock())
+    with process_lock:
+        if _lock_depth.get(filename, 0) == 0 and fcntl is not None:
+            lock_file = open(f"{filename}.lock", "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # Blocks until other processes release it
+            _lock_files[filename] = lock_file
+        _lock_depth[filename] = _lock_depth.get(filename, 0) + 1
+        try:
+            yield
+        finally:
+            _lock_depth[filename] -= 1
+            if _lock_depth[filename] == 0 and filename in _lock_files:
+                lock_file = _lock_files.pop(filename)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+def write_atomic(filename, data):
+    """Write JSON to a temp file, fsync it and rename it over the target, so readers and crashes never see a partial file."""
+    tmp_path = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, filename)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _file_version(filename):
+    stat = os.stat(filename)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)  # Atomic renames always change the inode
+
+def _journal_file(filename):
+    return f"{filename}.journal"
+
+def _apply_op(data, op, seen_ids):
+    """Apply one journal operation in place. Appends are idempotent by record id."""
+    if op["op"] == "set":
+        data[op["key"]] = op["value"]
+    elif op["op"] == "append":
+        record_id = op["value"].get("id")
+        if record_id not in seen_ids:  # Already folded into the snapshot by an interrupted compaction
+            data.setdefault(op["key"], []).append(op["value"])
+            seen_ids.add(record_id)
+
+def _record_ids(data):
+    return {
+        record.get("id")
+        for records in data.values() if isinstance(records, list)
+        for record in records if isinstance(record, dict)
+    }
+
+def _load_journaled(filename):
+    """Load the snapshot and replay the journal on top of it (cached until either file changes)."""
+    journal = _journal_file(filename)
+    version = (
+        _file_version(filename) if os.path.exists(filename) else None,
+        _file_version(journal) if os.path.exists(journal) else None,
+    )
+    with lock:
+        cached = _read_cache.get(filename)
+        if cached is not None and cached[0] == version:
+            read_cache_stats["hits"] += 1
+            return cached[1]
+        read_cache_stats["misses"] += 1
+
+    data = _read_json(filename)
+    seen_ids = _record_ids(data)
+    records = 0
+    try:
+        with open(journal, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    _apply_op(data, json.loads(line), seen_ids)
+                    records += 1
+                except json.JSONDecodeError:
+                    continue  # Torn line from a crash mid-append; only that record is lost
+    except FileNotFoundError:
+        pass
+    with lock:
+        _read_cache[filename] = (version, data)
+        _journal_state.setdefault(filename, {"last_fsync": 0.0})["records"] = records
+    return data
+
+def append_journal(filename, op):
+    """Durably append one operation to a file's journal, compacting once it grows past the limit."""
+    journal = _journal_file(filename)
+    line = (json.dumps(op) + "\n").encode("utf-8")
+    with file_lock(filename):
+        data = _load_journaled(filename)  # Cache reflects everything before this write
+        state = _journal_state[filename]
+        with open(journal, "ab+") as file:
+            if file.tell() > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    line = b"\n" + line  # Don't glue onto a torn line left by a crash
+            file.write(line)
+            file.flush()
+            now = time.monotonic()
+            if JOURNAL_FSYNC == "always" or (
+                JOURNAL_FSYNC == "interval" and now - state["last_fsync"] >= JOURNAL_FSYNC_INTERVAL
+            ):
+                os.fsync(file.fileno())
+                state["last_fsync"] = now
+        state["records"] += 1
+
+        # Apply the op to a copy of the cached data instead of re-reading both files
+        data = dict(data)
+        if op["op"] == "append":
+            data[op["key"]] = data.get(op["key"], []) + [op["value"]]
+        else:
+            data[op["key"]] = op["value"]
+        with lock:
+            _read_cache[filename] = ((_read_cache[filename][0][0], _file_version(journal)), data)
+
+        if state["records"] >= JOURNAL_COMPACT_RECORDS:
+            compact_journal(filename)
+
+def compact_journal(filename, data=None):
+    """
+    Fold the journal into a new snapshot (written to a temp file, fsynced, atomically renamed), then truncate it.
+    Pass data to replace the contents outright (e.g. after de-duplication).
+    """
+    journal = _journal_file(filename)
+    with file_lock(filename):
+        if data is None:
+            data = _load_journaled(filename)
+        write_atomic(filename, data)
+        # A crash here leaves journal entries that are already in the snapshot; replay skips them by id
+        with open(journal, "w", encoding="utf-8") as file:
+            os.fsync(file.fileno())
+        with lock:
+            _journal_state.setdefault(filename, {"last_fsync": 0.0})["records"] = 0
+            _read_cache[filename] = ((_file_version(filename), _file_version(journal)), data)
 
 def load_data(filename):
-    """Load data from a JSON file safely. Creates file if missing."""
+    """
+    Load data from a JSON file safely. Creates file if missing.
+    Parsed data is cached until the file changes; treat the result as read-only.
+    """
+    if STORAGE_BACKEND == "journal":
+        return _load_journaled(filename)
     if not os.path.exists(filename):
-        save_data({}, filename)  # Create an empty file
-        return {}
+        with file_lock(filename):
+            if not os.path.exists(filename):  # Another process may have created it meanwhile
+                save_data({}, filename)  # Create an empty file
+                return {}
 
     try:
+        version = _file_version(filename)
+        with lock:
+            cached = _read_cache.get(filename)
+            if cached is not None and cached[0] == version:
+                read_cache_stats["hits"] += 1
+                return cached[1]
+            read_cache_stats["misses"] += 1
         with open(filename, "r", encoding="utf-8") as file:
-            return json.load(file)
+            data = json.load(file)
+        with lock:
+            _read_cache[filename] = (version, data)
+        return data
     except (json.JSONDecodeError, FileNotFoundError):
-        print(f"⚠️ Warning: {filename} is corrupted or missing. Resetting file.")
-        save_data({}, filename)  # Reset file if corrupted
+        print(f"⚠️ Warning: {filename} is corrupted or missing. Resetting file (old copy kept as {filename}.corrupt).")
+        with file_lock(filename):
+            if os.path.exists(filename):
+                os.replace(filename, f"{filename}.corrupt")
+            save_data({}, filename)  # Reset file if corrupted
         return {}
 
 def save_data(data, filename):
-    """Safely save data to a JSON file using a lock."""
-    with lock:
+    """Safely save data to a JSON file using the cross-process lock and an atomic rename."""
+    with file_lock(filename):
         try:
-            with open(filename, "w", encoding="utf-8") as file:
-                json.dump(data, file, indent=4)
+            write_atomic(filename, data)
+            _read_cache[filename] = (_file_version(filename), data)  # Local writes refresh the cache
         except Exception as e:
+            _read_cache.pop(filename, None)
             print(f"⚠️ Error saving data to {filename}: {e}")
+
+def _stress_text(worker, i):
+    # Random-looking payload so distinct saves are never mistaken for near-duplicates
+    return f"worker {worker} save {i} " + uuid.uuid5(uuid.NAMESPACE_OID, f"{worker}-{i}").hex * 4
+
+def _stress_worker(worker, saves):
+    for i in range(saves):
+        save_achievement(f"user{i % 3}", "Stress", _stress_text(worker, i))  # Users shared across workers
+
+# ✅ Concurrency stress test (Optional): python -m utils.database stress
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Storage maintenance and checks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stress = commands.add_parser("stress", help="N processes doing interleaved saves; verifies no lost records")
+    stress.add_argument("--processes", type=int, default=8)
+    stress.add_argument("--saves", type=int, default=100)
+    commands.add_parser("dedupe", help="Remove duplicate achievements from the configured store")
+    commands.add_parser("split-blobs", help="Move inline achievement details into the blob store")
+    args = parser.parse_args()
+
+    if args.command == "split-blobs":
+        split_achievement_blobs()
+        print(f"📦 Moved inline achievement details into {BLOBS_DIR}/.")
+
+    if args.command == "dedupe":
+        print(f"🧹 Removed {dedupe_achievements()} duplicate achievement(s) from the {STORAGE_BACKEND} store.")
+
+    if args.command == "stress":
+        os.chdir(tempfile.mkdtemp(prefix="db-stress-"))  # Workers inherit the scratch directory
+        start = time.perf_counter()
+        workers = [
+            multiprocessing.Process(target=_stress_worker, args=(worker, args.saves))
+            for worker in range(args.processes)
+        ]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - start
+        _read_cache.clear()
+        saved = {record["details"] for username in ("user0", "user1", "user2") for record in get_achievements(username)}
+        expected = {_stress_text(worker, i) for worker in range(args.processes) for i in range(args.saves)}
+        print(f"{STORAGE_BACKEND}: {len(expected)} saves in {elapsed:.2f}s, {len(expected - saved)} lost, in {os.getcwd()}")
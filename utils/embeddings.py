@@ -0,0 +1,134 @@
+import functools
+import glob
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+import numpy as np
+from scipy import sparse
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # Optional: fall back to hashed character n-grams
+    SentenceTransformer = None
+
+# 🧭 Text embeddings for semantic event matching.
+# EMBEDDING_MODEL names a small local sentence-transformers model (e.g. "all-MiniLM-L6-v2");
+# if it is unset or the package is missing, texts are embedded as hashed character n-grams,
+# which catch word-form variants ("vehicle" / "vehicles", "cryptographic" / "cryptography")
+# but not synonyms ("deep learning" / "AI") -- that needs the model.
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "")
+HASHED_DIM = 512
+STALE_EMBEDDINGS_SECONDS = 24 * 3600  # Files for other catalog versions are removed once this old
+NGRAM_SIZES = (4, 5)  # 3-grams ("nce", "ing") mostly add noise
+
+_model = None
+_model_lock = threading.Lock()
+
+def backend_name():
+    """Identifies how vectors are made; embeddings from different backends are never mixed."""
+    if EMBEDDING_MODEL and SentenceTransformer is not None:
+        return EMBEDDING_MODEL
+    return f"hashed-ngrams-{HASHED_DIM}"
+
+def get_model():
+    """Lazily load the sentence-transformers model once (thread-safe)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+    return _model
+
+@functools.lru_cache(maxsize=100_000)
+def _word_features(word):
+    """Hashed n-gram buckets and signs of one word (words repeat a lot across events)."""
+    padded = f" {word} "
+    hashes = [zlib.crc32(padded[i:i + n].encode("utf-8")) for n in NGRAM_SIZES for i in range(max(1, len(padded) - n + 1))]
+    hashes = np.array(hashes, dtype=np.uint32)
+    return hashes % HASHED_DIM, np.where(hashes & 0x80000000, 1.0, -1.0)
+
+def hashed_vector(text):
+    """Unit-length signed feature-hashing vector of the text's character n-grams."""
+    features = [_word_features(word) for word in re.findall(r"[a-z0-9]+", (text or "").lower())]
+    if not features:
+        return np.zeros(HASHED_DIM, dtype=np.float32)
+    buckets = np.concatenate([bucket for bucket, _ in features])
+    signs = np.concatenate([sign for _, sign in features])
+    vector = np.bincount(buckets, weights=signs, minlength=HASHED_DIM).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def embed_texts(texts):
+    """Unit-length embeddings, one float32 row per text."""
+    if backend_name() == EMBEDDING_MODEL:
+        return get_model().encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+    embeddings = np.zeros((len(texts), HASHED_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        embeddings[row] = hashed_vector(text)
+    return embeddings
+
+def load_or_build(path_prefix, texts):
+    """
+    Embeddings of texts, memory-mapped from "<path_prefix>.embeddings-<hash>.npy". The hash
+    covers the texts and the backend, so the file is only (re)built when either changes.
+    If the file can't be written (e.g. a read-only data directory), they are kept in memory.
+    """
+    if not texts:
+        return embed_texts(texts)
+    digest = hashlib.sha1("\0".join([backend_name(), *texts]).encode("utf-8")).hexdigest()[:16]
+    path = f"{path_prefix}.embeddings-{digest}.npy"
+    try:
+        if not os.path.exists(path):
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, "wb") as f:
+                    np.save(f, embed_texts(texts))
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            _remove_stale(path_prefix, path)
+        return np.load(path, mmap_mode="r")
+    except OSError as e:
+        print(f"⚠️ Could not store embeddings at {path} ({e}); keeping them in memory.")
+        return embed_texts(texts)
+
+def _remove_stale(path_prefix, current):
+    """
+    Remove other versions' embedding files once they are old. A recent one may belong to the
+    catalog another process is loading right now; processes that mapped one keep their copy.
+    """
+    for stale in glob.glob(f"{glob.escape(path_prefix)}.embeddings-*.npy"):
+        try:
+            if stale != current and time.time() - os.path.getmtime(stale) > STALE_EMBEDDINGS_SECONDS:
+                os.remove(stale)
+        except OSError:
+            pass
+
+def nearest(embeddings, vector, n):
+    """
+    Exact nearest neighbours by cosine similarity: (positions, similarities), best first. Events
+    tied with the n-th best are all kept, so the result doesn't depend on argpartition's order.
+    """
+    similarities = embeddings @ vector
+    if len(similarities) > n:
+        best = np.flatnonzero(similarities >= np.partition(similarities, -n)[-n])
+    else:
+        best = np.arange(len(similarities))
+    best = best[np.argsort(-similarities[best], kind="stable")]
+    return best, similarities[best]
+
+def nearest_batch(embeddings, vectors, n, min_similarity):
+    """
+    nearest() for many query vectors with one matrix product: a sparse (queries x events) matrix
+    of each query's similarities to its n nearest events (ties included) that reach min_similarity.
+    """
+    similarities = vectors @ embeddings.T
+    threshold = np.float32(min_similarity)
+    if similarities.shape[1] > n:
+        threshold = np.maximum(np.partition(similarities, -n, axis=1)[:, [-n]], threshold)
+    rows, cols = np.nonzero(similarities >= threshold)
+    return sparse.csr_matrix((similarities[rows, cols], (rows, cols)), shape=similarities.shape)
@@ -0,0 +1,72 @@
+import hashlib
+import heapq
+import re
+import zlib
+
+# 🔍 Duplicate detection settings
+SHINGLE_SIZE = 5  # Characters per shingle (robust to OCR misreads of single letters)
+SKETCH_SIZE = 32  # Smallest shingle hashes kept per text (bottom-k MinHash)
+NEAR_DUPLICATE_THRESHOLD = 0.85  # Estimated Jaccard similarity above which texts count as the same
+NEAR_DUPLICATE_MIN_CHARS = 200  # Shorter texts only match exactly: one changed name is a big share of their shingles
+
+def normalize_text(text):
+    """Lowercase and keep only words of letters/digits, so spacing and punctuation noise don't matter."""
+    return " ".join(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+def text_fingerprint(text):
+    """Exact-duplicate fingerprint: SHA-1 of the normalised text."""
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+def number_tokens(text):
+    """Sorted distinct all-digit words (years, dates, certificate numbers)."""
+    return sorted({word for word in normalize_text(text).split() if word.isdigit()})
+
+def minhash_signature(text):
+    """
+    Bottom-k MinHash sketch of the text's character shingles: the SKETCH_SIZE
+    smallest shingle hashes. One hash per shingle keeps this cheap for long OCR dumps.
+    Texts shorter than NEAR_DUPLICATE_MIN_CHARS get an empty sketch (exact matching only).
+    """
+    normalized = normalize_text(text)
+    if len(normalized) < NEAR_DUPLICATE_MIN_CHARS:
+        return []
+    shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(max(1, len(normalized) - SHINGLE_SIZE + 1))}
+    return sorted(heapq.nsmallest(SKETCH_SIZE, {zlib.crc32(shingle.encode("utf-8")) for shingle in shingles}))
+
+def estimate_similarity(signature_a, signature_b):
+    """Estimate the Jaccard similarity of two texts from their sketches."""
+    if not signature_a or not signature_b:
+        return 0.0
+    a, b = set(signature_a), set(signature_b)
+    union_sketch = set(heapq.nsmallest(SKETCH_SIZE, a | b))
+    return len(union_sketch & a & b) / len(union_sketch)
+
+def find_duplicate(record, existing_records, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Return the first existing record that is an exact or near duplicate of record, else None.
+    Near duplicates must also carry the same numbers, so the 2023 and 2024 editions of a
+    certificate both count. Records are dicts with "details" and optionally precomputed
+    "fingerprint"/"minhash"/"numbers" (older records without "numbers" skip that check).
+    """
+    fingerprint = record.get("fingerprint") or text_fingerprint(record.get("details"))
+    signature = numbers = None
+    for existing in existing_records:
+        if not isinstance(existing, dict):
+            continue
+        if (existing.get("fingerprint") or text_fingerprint(existing.get("details"))) == fingerprint:
+            return existing
+        if signature is None:
+            signature = _precomputed(record, "minhash", minhash_signature)
+            numbers = _precomputed(record, "numbers", number_tokens)
+        if estimate_similarity(signature, _precomputed(existing, "minhash", minhash_signature)) < threshold:
+            continue
+        existing_numbers = _precomputed(existing, "numbers", number_tokens)
+        if existing_numbers is None or numbers is None or existing_numbers == numbers:
+            return existing
+    return None
+
+def _precomputed(record, field, compute):
+    """record[field] if stored, else computed from inline details, else None (details live in a blob)."""
+    if record.get(field) is not None:
+        return record[field]
+    return compute(record["details"]) if record.get("details") is not None else None
@@ -1,27 +1,398 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
 import easyocr
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import ExifTags, Image
 
-# ✅ Initialize EasyOCR Reader
-reader = easyocr.Reader(["en"])  # Language: English
+# ✅ OCR Settings
+OCR_LANGUAGES = ["en"]  # Language: English
+
+OCR_BATCH_SIZE = 8  # Images per detection/recognition batch
+
+# 🖼 Pre-OCR image pipeline
+OCR_MAX_SIDE = 1600  # Longest side in pixels; larger scans and photos are downscaled
+OCR_BORDER_TOLERANCE = 16  # Grey levels a blank border row/column may differ from the background
+
+# 📄 PDF ingestion
+PDF_RENDER_DPI = 200  # Resolution for rasterising scanned pages (still capped by OCR_MAX_SIDE)
+PDF_PREVIEW_DPI = 72  # Resolution for on-screen page previews
+PDF_MIN_TEXT_CHARS = 20  # Pages with less native text than this are treated as scans and OCR'd
+
+# 🧵 "thread" runs OCR in the calling process; "process" spreads it over worker processes
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "thread")
+OCR_PROCESS_WORKERS = int(os.environ.get("OCR_PROCESS_WORKERS", str(os.cpu_count() or 1)))
+
+# 💾 On-disk OCR result cache (keyed by image content + engine settings)
+OCR_CACHE_DIR = ".ocr_cache"
+OCR_CACHE_MAX_BYTES = 50 * 1024 * 1024  # Oldest entries are evicted past this size
+cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_cache_lock = threading.Lock()
+
+# 🔒 One EasyOCR reader per process, created on first use
+_reader = None
+_reader_lock = threading.Lock()
+
+def get_reader():
+    """
+    Return the process-wide EasyOCR reader, loading the models on first use.
+    Safe to call from concurrent Streamlit sessions; reruns reuse the same reader.
+    """
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:  # Another thread may have won the race
+                _reader = easyocr.Reader(OCR_LANGUAGES)
+    return _reader
+
+# 🏭 Worker processes for the "process" backend, each holding its own preloaded reader
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def _init_ocr_worker():
+    import torch
+    torch.set_num_threads(1)  # Parallelism comes from the worker count, not intra-op threads
+    get_reader()
+
+def create_process_pool(workers=OCR_PROCESS_WORKERS):
+    """Start a pool of OCR worker processes that load their readers up front."""
+    # Spawn rather than fork: forking a process with torch threads running can deadlock
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_ocr_worker)
+
+def get_process_pool():
+    """Return the shared OCR process pool, starting it on first use."""
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                _process_pool = create_process_pool()
+    return _process_pool
+
+def _ocr_arrays(arrays, batch_size=OCR_BATCH_SIZE):
+    """Run EasyOCR on same-sized RGB arrays with this process's reader."""
+    reader = get_reader()
+    if len(arrays) == 1:
+        return [_join_lines(reader.readtext(arrays[0]))]
+    return [_join_lines(results) for results in reader.readtext_batched(arrays, batch_size=batch_size)]
+
+def _join_lines(results):
+    """
+    Join EasyOCR (box, text, confidence) results into lines: boxes whose vertical centres are
+    within half a box height of each other share a line, read left to right. Keeping the
+    line breaks lets derive_title() pick the heading instead of the start of a text dump.
+    """
+    lines = []  # [centre y, half height, [(left x, text), ...]]
+    for box, text, _ in sorted(results, key=lambda result: sum(point[1] for point in result[0])):
+        ys = [point[1] for point in box]
+        centre, half_height = (min(ys) + max(ys)) / 2, (max(ys) - min(ys)) / 2
+        if lines and abs(centre - lines[-1][0]) <= max(half_height, lines[-1][1]):
+            lines[-1][2].append((min(point[0] for point in box), text))
+        else:
+            lines.append([centre, half_height, [(min(point[0] for point in box), text)]])
+    return "\n".join(" ".join(text for _, text in sorted(words)) for _, _, words in lines)
+
+def _submit_ocr(arrays, batch_size=OCR_BATCH_SIZE):
+    """Start OCR on the configured backend and return a Future for the texts."""
+    if OCR_BACKEND == "process":
+        return get_process_pool().submit(_ocr_arrays, arrays, batch_size)
+    future = Future()  # The thread backend runs inline and hands back a finished future
+    try:
+        future.set_result(_ocr_arrays(arrays, batch_size))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def image_cache_key(array):
+    """
+    Fingerprint a pre-processed image by its pixels plus the OCR engine, version, languages
+    and pipeline settings, so the same certificate re-uploaded maps to the same cache entry.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"easyocr:{easyocr.__version__}:{','.join(OCR_LANGUAGES)}:{OCR_MAX_SIDE}:{array.shape}:lines".encode())
+    digest.update(memoryview(array))  # Hash the buffer in place (array is C-contiguous)
+    return digest.hexdigest()
+
+def _cache_path(key):
+    return os.path.join(OCR_CACHE_DIR, f"{key}.txt")
+
+def cache_get(key):
+    """Return cached text for a key (refreshing its LRU position) or None."""
+    path = _cache_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            text = file.read()
+        os.utime(path)  # Mark as recently used
+    except FileNotFoundError:
+        with _cache_lock:
+            cache_stats["misses"] += 1
+        return None
+    with _cache_lock:
+        cache_stats["hits"] += 1
+    return text
+
+def cache_put(key, text):
+    """Store OCR text under a key, then evict least recently used entries over the size limit."""
+    os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+    path = _cache_path(key)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp_path, path)  # Readers never see a half-written entry
+    _evict_cache()
+
+def _evict_cache():
+    with _cache_lock:
+        entries = []
+        for entry in os.scandir(OCR_CACHE_DIR):
+            if entry.name.endswith(".txt"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= OCR_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Already evicted by another process
+            total -= size
+            cache_stats["evictions"] += 1
+
+# EXIF orientation -> transpose that puts the image upright (same table as ImageOps.exif_transpose)
+_EXIF_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+def preprocess_image(image, max_side=OCR_MAX_SIDE):
+    """
+    Prepare a certificate for OCR: grayscale, longest side capped, EXIF-rotated, blank borders cropped.
+    The caller's image is left untouched; only the reduced grayscale copy is transformed.
+    :param image: PIL Image object
+    :return: 2-D uint8 NumPy array
+    """
+    orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+    gray = image.convert("L")  # One copy at a third of the RGB size
+    gray.thumbnail((max_side, max_side))  # Downscales in place, never upscales
+    if orientation in _EXIF_TRANSPOSE:
+        gray = gray.transpose(_EXIF_TRANSPOSE[orientation])
+    return _crop_borders(np.asarray(gray))
+
+def _crop_borders(array, tolerance=OCR_BORDER_TOLERANCE):
+    """Trim rows/columns that only contain the background colour, using per-axis min/max (no full-size temporaries)."""
+    background = int(np.median(array[[0, 0, -1, -1], [0, -1, 0, -1]]))  # Median of the four corners
+    low, high = max(0, background - tolerance), min(255, background + tolerance)
+    rows = np.flatnonzero((array.min(axis=1) < low) | (array.max(axis=1) > high))
+    cols = np.flatnonzero((array.min(axis=0) < low) | (array.max(axis=0) > high))
+    if rows.size == 0 or cols.size == 0:
+        return np.ascontiguousarray(array)  # Blank page: nothing to crop to
+    # Slicing is a view; the single contiguous copy is of the cropped region only
+    return np.ascontiguousarray(array[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1])
 
 def extract_text_from_image(image):
     """
-    Extract text from an image using EasyOCR.
+    Extract text from an image using EasyOCR, serving repeat images from the OCR cache.
     :param image: PIL Image object
     :return: Extracted text as a string
     """
     try:
-        text = reader.readtext(image, detail=0)  # Extract text without bounding box details
-        return " ".join(text)  # Join the text list into a single string
+        array = preprocess_image(image)
+        key = image_cache_key(array)
+        text = cache_get(key)
+        if text is None:
+            text = _submit_ocr([array]).result()[0]
+            cache_put(key, text)
+        return text
     except Exception as e:
         return f"Error extracting text: {e}"
 
+def extract_texts_from_images(images, batch_size=OCR_BATCH_SIZE):
+    """
+    Extract text from many images, running uncached ones through EasyOCR in batches.
+    :param images: List of PIL Image objects
+    :return: List of extracted texts, in the same order as the images
+    """
+    return extract_texts_from_arrays([preprocess_image(image) for image in images], batch_size=batch_size)
+
+def extract_texts_from_arrays(arrays, batch_size=OCR_BATCH_SIZE):
+    """
+    Batched OCR over pre-processed grayscale arrays, skipping ones already in the cache.
+    The batched detector needs equal shapes, and cropped scans all differ slightly, so arrays
+    are sorted by size and each batch is padded to its largest member.
+    :return: List of extracted texts, in the same order as the arrays
+    """
+    texts = [None] * len(arrays)
+    keys = [image_cache_key(array) for array in arrays]
+    pending = []  # [(index, array)]
+    for idx, (array, key) in enumerate(zip(arrays, keys)):
+        texts[idx] = cache_get(key)
+        if texts[idx] is None:
+            pending.append((idx, array))
+    pending.sort(key=lambda item: item[1].shape)  # Similar sizes share a batch, so little padding
+    groups = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+
+    # With the process backend every batch runs on its own worker at the same time
+    futures = [([idx for idx, _ in group], _submit_ocr(_pad_to_common_shape([array for _, array in group]), batch_size))
+               for group in groups]
+    for indices, future in futures:
+        try:
+            results = future.result()
+        except Exception as e:
+            for idx in indices:
+                texts[idx] = f"Error extracting text: {e}"
+            continue
+        for idx, text in zip(indices, results):
+            texts[idx] = text
+            cache_put(keys[idx], text)
+    return texts
+
+def _pad_to_common_shape(arrays):
+    """Pad arrays at the bottom and right with their most common (background) grey level to one shape."""
+    height = max(array.shape[0] for array in arrays)
+    width = max(array.shape[1] for array in arrays)
+    return [array if array.shape == (height, width) else
+            np.pad(array, ((0, height - array.shape[0]), (0, width - array.shape[1])),
+                   constant_values=np.bincount(array.ravel(), minlength=256).argmax())
+            for array in arrays]
+
+def pdf_page_text(page):
+    """Return a page's native text layer, or None if it is too sparse to be a digital page."""
+    text = page.get_text().strip()
+    return text if len(text) >= PDF_MIN_TEXT_CHARS else None
+
+def render_pdf_page(page, dpi=PDF_RENDER_DPI, max_side=OCR_MAX_SIDE, crop=True):
+    """
+    Rasterise a PDF page straight to a grayscale array, lowering the DPI so the
+    longest side stays within max_side, then (optionally) crop blank borders.
+    :return: 2-D uint8 NumPy array
+    """
+    dpi = min(dpi, 72 * max_side / max(page.rect.width, page.rect.height))  # PDF units are 1/72 inch
+    pixmap = page.get_pixmap(dpi=int(dpi), colorspace=fitz.csGRAY, alpha=False)
+    array = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.stride)
+    array = array[:, :pixmap.width]  # Rows may be padded to the stride
+    return _crop_borders(array) if crop else np.ascontiguousarray(array)
+
+def open_pdf(pdf_file):
+    """
+    Open a PDF from a path (pages are read from disk on demand), bytes, or a file-like object.
+    Use as a context manager so the document is released as soon as it is consumed.
+    """
+    if isinstance(pdf_file, (str, os.PathLike)):
+        return fitz.open(pdf_file)
+    if not isinstance(pdf_file, (bytes, bytearray)):
+        pdf_file = pdf_file.read()
+    return fitz.open(stream=pdf_file, filetype="pdf")
+
+def pdf_page_count(pdf_file):
+    """Return the number of pages in a PDF without rendering anything."""
+    with open_pdf(pdf_file) as pdf_document:
+        return pdf_document.page_count
+
+def iter_pdf_previews(pdf_file, dpi=PDF_PREVIEW_DPI):
+    """
+    Render the pages of a PDF for display (vector-only pages included), one at a time.
+    :param pdf_file: Path, bytes or file-like object containing the PDF
+    :return: Generator of 2-D uint8 NumPy arrays
+    """
+    with open_pdf(pdf_file) as pdf_document:
+        for page in pdf_document:
+            yield render_pdf_page(page, dpi=dpi, crop=False)
+
+def iter_pdf_texts(pdf_file, batch_size=1):
+    """
+    Stream text out of a PDF page by page. Digitally generated pages use their native
+    text layer; scanned pages are rendered and OCR'd, batch_size pages at a time.
+    At most batch_size rendered pages are held in memory, whatever the document length.
+    :param pdf_file: Path, bytes or file-like object containing the PDF
+    :return: Generator of extracted texts, one per page, in page order
+    """
+    with open_pdf(pdf_file) as pdf_document:
+        pending = []  # Page texts in order; None marks a scanned page waiting for OCR
+        scanned = []  # Rendered arrays for the None entries, in order
+        for page in pdf_document:
+            text = pdf_page_text(page)
+            if text is None:
+                scanned.append(render_pdf_page(page))
+            pending.append(text)
+            if not scanned:
+                yield from pending  # Digital pages are released straight away
+                pending = []
+            elif len(scanned) >= batch_size:
+                yield from _fill_ocr_texts(pending, scanned, batch_size)
+                pending, scanned = [], []
+        if scanned:
+            yield from _fill_ocr_texts(pending, scanned, batch_size)
+
+def _fill_ocr_texts(pending, scanned, batch_size):
+    ocr_texts = iter(extract_texts_from_arrays(scanned, batch_size=batch_size))
+    return [text if text is not None else next(ocr_texts) for text in pending]
+
+def extract_texts_from_pdf(pdf_file, batch_size=OCR_BATCH_SIZE):
+    """
+    Extract text from every page of a PDF (see iter_pdf_texts).
+    :param pdf_file: Path, bytes or file-like object containing the PDF
+    :return: List of extracted texts, one per page, in page order
+    """
+    return list(iter_pdf_texts(pdf_file, batch_size=batch_size))
+
 # ✅ Test the function (Optional)
 if __name__ == "__main__":
+    import resource
+    import time
+
+    # ⏱ Startup benchmark: model load time and peak RSS for a single reader
+    start = time.perf_counter()
+    get_reader()
+    print(f"Reader load: {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    get_reader()
+    print(f"Reader reuse: {(time.perf_counter() - start) * 1000:.3f}ms")
+    print(f"Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
     image_path = "test_image.png"  # Change to your image path
     try:
-        from PIL import Image
         img = Image.open(image_path)
         extracted_text = extract_text_from_image(img)
         print("Extracted Text:", extracted_text)
+
+        # ⏱ Cache benchmark: the second call should be served from disk
+        start = time.perf_counter()
+        extract_text_from_image(img)
+        print(f"Cached OCR: {(time.perf_counter() - start) * 1000:.1f}ms, stats: {cache_stats}")
     except FileNotFoundError:
         print(f"⚠ Image not found at {image_path}")
+
+    # ⏱ Throughput benchmark: images/second vs worker count on a fixed corpus (uncached)
+    corpus_dir = "benchmark_images"  # Folder of sample certificates
+    if os.path.isdir(corpus_dir):
+        originals = [Image.open(os.path.join(corpus_dir, name)) for name in sorted(os.listdir(corpus_dir))]
+        corpus = [preprocess_image(image) for image in originals]
+
+        # 🎯 Pre-processing check: latency and word overlap vs the raw RGB image
+        for name, image, array in zip(sorted(os.listdir(corpus_dir)), originals, corpus):
+            start = time.perf_counter()
+            raw_words = set(_ocr_arrays([np.asarray(image.convert("RGB"))])[0].lower().split())
+            raw_time = time.perf_counter() - start
+            start = time.perf_counter()
+            words = set(_ocr_arrays([array])[0].lower().split())
+            prep_time = time.perf_counter() - start
+            overlap = len(raw_words & words) / max(1, len(raw_words | words))
+            print(f"{name}: raw {raw_time:.2f}s, pre-processed {prep_time:.2f}s ({array.shape[1]}x{array.shape[0]}), word overlap {overlap:.0%}")
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            with create_process_pool(workers) as pool:
+                list(pool.map(_ocr_arrays, [[array] for array in corpus[:workers]]))  # Warm up every worker
+                start = time.perf_counter()
+                list(pool.map(_ocr_arrays, [[array] for array in corpus]))
+                elapsed = time.perf_counter() - start
+            print(f"{workers} worker(s): {len(corpus) / elapsed:.2f} images/s")
+            workers *= 2
@@ -0,0 +1,103 @@
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from utils.ocr import (OCR_BACKEND, OCR_BATCH_SIZE, OCR_PROCESS_WORKERS, extract_texts_from_images, iter_pdf_texts,
+                       pdf_page_count)
+from utils.database import save_achievement
+
+# ⚙️ Background OCR workers shared by every session in this process. A job thread blocks while its
+# OCR runs, so with the "process" backend there is one per OCR process to keep every core busy.
+OCR_JOB_WORKERS = int(os.environ.get("OCR_JOB_WORKERS", OCR_PROCESS_WORKERS if OCR_BACKEND == "process" else 2))
+MAX_FINISHED_JOBS = 1000  # Oldest finished jobs are forgotten past this count
+
+_executor = None
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    with _jobs_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=OCR_JOB_WORKERS, thread_name_prefix="ocr-job")
+        return _executor
+
+def submit_ocr_job(username, images, category="Certificate"):
+    """
+    Queue OCR for a list of images and return a job id to poll with get_job().
+    Each extracted text is saved as an achievement for the user when the job runs.
+    """
+    images = list(images)
+    batches = (extract_texts_from_images(images[start:start + OCR_BATCH_SIZE])
+               for start in range(0, len(images), OCR_BATCH_SIZE))  # Lazy: runs on the worker thread
+    return _submit_job(username, batches, len(images), category)
+
+def submit_pdf_ocr_job(username, pdf_bytes, category="Certificate"):
+    """
+    Queue text extraction for a PDF and return a job id to poll with get_job().
+    Pages with a native text layer skip OCR; the pages' texts are saved as one achievement.
+    """
+    return _submit_job(username, _pdf_batches(pdf_bytes), pdf_page_count(pdf_bytes), category, combine=True)
+
+def _pdf_batches(pdf_bytes):
+    # Scanned pages are OCR'd OCR_BATCH_SIZE at a time; memory is bounded by that, not the page count
+    for text in iter_pdf_texts(pdf_bytes, batch_size=OCR_BATCH_SIZE):
+        yield [text]
+
+def _submit_job(username, batches, total, category, combine=False):
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _jobs[job_id] = {"status": "queued", "done": 0, "total": total, "saved": 0, "duplicates": 0, "error": None}
+    _get_executor().submit(_run_job, job_id, username, batches, category, combine)
+    return job_id
+
+def get_job(job_id):
+    """Return a snapshot of a job's status, progress and save counts, or None if unknown."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        snapshot = dict(job)
+    snapshot["progress"] = snapshot["done"] / snapshot["total"] if snapshot["total"] else 1.0
+    return snapshot
+
+def _update_job(job_id, **changes):
+    with _jobs_lock:
+        _jobs[job_id].update(changes)
+
+def _save_texts(job_id, username, category, texts):
+    saved = duplicates = 0
+    for text in texts:
+        if save_achievement(username, category, text):
+            saved += 1
+        else:
+            duplicates += 1
+    with _jobs_lock:
+        _jobs[job_id]["saved"] += saved
+        _jobs[job_id]["duplicates"] += duplicates
+
+def _run_job(job_id, username, batches, category, combine):
+    # combine: one achievement for the whole upload (a multi-page PDF is one certificate)
+    _update_job(job_id, status="running")
+    try:
+        pages = []
+        for texts in batches:
+            usable = [text for text in texts if text.strip() and not text.startswith("Error extracting text")]
+            if combine:
+                pages.extend(usable)
+            else:
+                _save_texts(job_id, username, category, usable)
+            with _jobs_lock:
+                _jobs[job_id]["done"] += len(texts)
+        if pages:
+            _save_texts(job_id, username, category, ["\n\n".join(pages)])
+        _update_job(job_id, status="done")
+    except Exception as e:
+        _update_job(job_id, status="failed", error=str(e))
+    _prune_jobs()
+
+def _prune_jobs():
+    with _jobs_lock:
+        finished = [job_id for job_id, job in _jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del _jobs[job_id]
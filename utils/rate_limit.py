@@ -0,0 +1,43 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TokenBucketLimiter:
+    """
+    Token buckets per key (e.g. username or client IP): each key may burst `capacity`
+    requests, then gets `rate` more per second. At most `max_keys` buckets are kept;
+    the least recently used one is dropped (which simply resets that key to a full bucket).
+    """
+
+    def __init__(self, capacity, rate, max_keys=100_000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last refill time)
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def consume(self, key):
+        """Take one token for key; returns False (and takes nothing) if the bucket is empty."""
+        with self._lock:
+            now = time.monotonic()
+            tokens = self._tokens(key, now)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def refund(self, key):
+        """Give back a token taken by consume(), e.g. when the request turned out to be legitimate."""
+        with self._lock:
+            if key in self._buckets:
+                now = time.monotonic()
+                self._buckets[key] = (min(self.capacity, self._tokens(key, now) + 1), now)
+
+    def __len__(self):
+        return len(self._buckets)
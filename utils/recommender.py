@@ -1,23 +1,341 @@
-import random
-
-# Sample event database
-EVENTS = [
-    {"title": "AI & ML Conference", "category": "Artificial Intelligence"},
-    {"title": "Hackathon 2025", "category": "Coding"},
-    {"title": "Electric Vehicles Expo", "category": "Automobile"},
-    {"title": "Research Paper Submission", "category": "Academics"},
-    {"title": "Cybersecurity Challenge", "category": "Cybersecurity"},
-    {"title": "Renewable Energy Summit", "category": "Energy"},
-]
-
-def recommend_events(skills):
-    """
-    Recommend events based on user skills.
-    """
-    recommended = [event for event in EVENTS if any(skill.lower() in event["category"].lower() for skill in skills)]
-    
-    # If no exact matches, suggest random ones
-    if not recommended:
-        recommended = random.sample(EVENTS, min(3, len(EVENTS)))
-    
-    return recommended
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+import numpy as np
+from scipy import sparse
+from utils import collaborative, database, embeddings
+
+# 📅 Event catalog: a JSON list of {"title", "category", "description"} objects, reloaded when the file changes
+EVENTS_FILE = "data/events.json"
+
+# 🔍 Ranking settings (BM25 over the event's fields)
+FIELD_WEIGHTS = {"category": 3, "title": 2, "description": 1}  # Term-frequency multiplier per field
+BM25_K1 = 1.2  # Term-frequency saturation
+BM25_B = 0.75  # Document-length normalisation
+MIN_PREFIX_LENGTH = 3  # Interest words this long also match longer words ("cyber" -> "cybersecurity")
+PREFIX_WEIGHT = 0.5  # Query weight of a prefix match relative to an exact word match
+RECOMMEND_TOP_K = 10
+BATCH_CHUNK_USERS = 500  # Users scored per sparse product in recommend_events_batch (bounds memory)
+CF_WEIGHT = 0.3  # Share of a signed-in user's score that comes from collaborative filtering
+
+# 🧭 Semantic matching (see utils/embeddings.py); event embeddings are built at catalog load, never per request
+SEMANTIC_WEIGHT = float(os.environ.get("SEMANTIC_WEIGHT", 0))  # Share of the interest score from embeddings (e.g. 0.3); 0 disables
+SEMANTIC_TOP_N = 50  # Nearest events considered per query
+SEMANTIC_MIN_SIMILARITY = float(os.environ.get("SEMANTIC_MIN_SIMILARITY", 0.2))  # Tuned for hashed n-grams; ~0.35 suits a sentence model
+
+# 🧠 Interest-match scores cached per (catalog version, interest words); ratings are blended in per request
+RECOMMEND_CACHE_SIZE = 1024  # Interest sets kept
+RECOMMEND_CACHE_TTL = 600  # Seconds before a cached entry is recomputed anyway
+
+# Everything a query needs, built together and swapped in as one object.
+# Term ids are positions in the sorted vocabulary, so a prefix match is a contiguous range of columns.
+Catalog = namedtuple("Catalog", ["version", "events", "vocabulary", "matrix", "positions", "embeddings"])
+
+_catalog = None
+_reload_lock = threading.Lock()
+
+_score_cache = OrderedDict()  # (catalog version, frozenset of words) -> (time stored, (positions, scores))
+_score_cache_lock = threading.Lock()
+score_cache_stats = {"hits": 0, "misses": 0}
+
+def tokenize(text):
+    """Lowercase words of letters/digits."""
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+def build_matrix(events):
+    """
+    Return (vocabulary, matrix): the sorted terms and an events x terms sparse matrix of BM25
+    weights, stored column-wise (CSC) so scoring a query only reads its own terms' columns.
+    """
+    term_counts = []
+    for event in events:
+        counts = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(event.get(field)):
+                counts[token] += weight
+        term_counts.append(counts)
+    vocabulary = sorted({token for counts in term_counts for token in counts})
+    term_ids = {token: term_id for term_id, token in enumerate(vocabulary)}
+
+    rows = np.repeat(np.arange(len(events)), [len(counts) for counts in term_counts])
+    cols = np.fromiter((term_ids[token] for counts in term_counts for token in counts), dtype=np.int64, count=len(rows))
+    tf = np.fromiter((count for counts in term_counts for count in counts.values()), dtype=np.float32, count=len(rows))
+    lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+    df = np.bincount(cols, minlength=len(vocabulary))
+    idf = np.log1p((len(events) - df + 0.5) / (df + 0.5)).astype(np.float32)
+    norm = 1 - BM25_B + BM25_B * lengths / max(lengths.mean() if len(events) else 0, 1)
+    weights = idf[cols] * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm[rows])
+    return vocabulary, sparse.csc_matrix((weights, (rows, cols)), shape=(len(events), len(vocabulary)), dtype=np.float32)
+
+def _file_version(filename):
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def load_catalog(filename=EVENTS_FILE):
+    """Read the events file and build its indexes."""
+    version = _file_version(filename)
+    events = ()
+    if version is None:
+        print(f"⚠️ {filename} not found; no events to recommend.")
+    else:
+        with open(filename, "r") as f:
+            events = tuple(json.load(f))
+    vocabulary, matrix = build_matrix(events)
+    positions = {event.get("title"): position for position, event in enumerate(events)}  # Ratings refer to events by title
+    event_embeddings = None
+    if SEMANTIC_WEIGHT > 0:
+        texts = [" ".join(event.get(field) or "" for field in FIELD_WEIGHTS) for event in events]
+        event_embeddings = embeddings.load_or_build(filename, texts)  # Memory-mapped, reused across restarts
+    return Catalog(version, events, vocabulary, matrix, positions, event_embeddings)
+
+def _reload_catalog():
+    """Rebuild the catalog if EVENTS_FILE changed. Call with _reload_lock held."""
+    global _catalog
+    if _catalog is not None and _catalog.version == _file_version(EVENTS_FILE):
+        return
+    try:
+        _catalog = load_catalog(EVENTS_FILE)  # One reference assignment: readers see the old or the new catalog, never a mix
+        with _score_cache_lock:
+            _score_cache.clear()  # Entries are keyed by catalog version, so this only frees memory
+    except (OSError, ValueError, KeyError, AttributeError, TypeError) as e:
+        if _catalog is None:
+            raise
+        print(f"⚠️ Keeping the previous event catalog; could not load {EVENTS_FILE}: {e}")
+        _catalog = _catalog._replace(version=_file_version(EVENTS_FILE))  # Don't retry until it changes again
+
+def _reload_in_background():
+    try:
+        _reload_catalog()
+    finally:
+        _reload_lock.release()
+
+def get_catalog():
+    """
+    Return the current catalog. The first call loads it; after that, a change to EVENTS_FILE
+    is picked up by a background rebuild while requests keep using the previous catalog.
+    """
+    catalog = _catalog
+    if catalog is None:
+        with _reload_lock:
+            _reload_catalog()
+        return _catalog
+    if catalog.version != _file_version(EVENTS_FILE) and _reload_lock.acquire(blocking=False):
+        threading.Thread(target=_reload_in_background, daemon=True).start()  # Releases the lock when done
+    return catalog
+
+def query_weights(catalog, skills):
+    """Map an interests string to {term id: weight}: 1 for the word itself, PREFIX_WEIGHT for longer words it starts."""
+    weights = {}
+    vocabulary = catalog.vocabulary
+    for word in set(tokenize(skills)):
+        start = bisect.bisect_left(vocabulary, word)
+        if len(word) < MIN_PREFIX_LENGTH:
+            end = start + (start < len(vocabulary) and vocabulary[start] == word)
+        else:
+            end = bisect.bisect_left(vocabulary, word + "￿")
+        for term_id in range(start, end):
+            weight = 1.0 if vocabulary[term_id] == word else PREFIX_WEIGHT
+            weights[term_id] = max(weights.get(term_id, 0.0), weight)
+    return weights
+
+def top_k(scores, k, positions=None):
+    """
+    Indexes of the k highest positive scores, best first. Ties are ordered by index, or by
+    positions[index] when scores come from an unsorted sparse row.
+    """
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    order = candidates if positions is None else positions[candidates]
+    return candidates[np.lexsort((order, -scores[candidates]))]
+
+def _blend_ratings(catalog, scores, username):
+    """Mix in collaborative-filtering scores for username and drop events they already rated (updates scores in place)."""
+    if scores.max(initial=0) > 0:
+        scores *= (1 - CF_WEIGHT) / scores.max()
+    cf_scores = collaborative.recommend_for_user(username)
+    best = max(cf_scores.values(), default=0)
+    for title, score in cf_scores.items():
+        position = catalog.positions.get(title)
+        if position is not None:
+            scores[position] += CF_WEIGHT * score / best
+    for title in collaborative.user_ratings(username):
+        position = catalog.positions.get(title)
+        if position is not None:
+            scores[position] = 0
+    return scores
+
+def text_scores(catalog, skills):
+    """
+    Scores of the events matching an interests string, as (positions, scores) arrays, best
+    first: BM25 keyword scores, blended with embedding similarity if semantic matching is on.
+    Cached per set of interest words, so "AI, coding" and "coding ai" share an entry.
+    """
+    words = frozenset(tokenize(skills))
+    key = (catalog.version, words)
+    now = time.monotonic()
+    with _score_cache_lock:
+        entry = _score_cache.get(key)
+        if entry is not None and now - entry[0] < RECOMMEND_CACHE_TTL:
+            _score_cache.move_to_end(key)
+            score_cache_stats["hits"] += 1
+            return entry[1]
+        score_cache_stats["misses"] += 1
+    weights = query_weights(catalog, skills)
+    if weights:
+        columns = np.fromiter(weights, dtype=np.int64, count=len(weights))
+        scores = catalog.matrix[:, columns] @ np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+    else:
+        scores = np.zeros(len(catalog.events), dtype=np.float32)
+    if catalog.embeddings is not None and words:
+        query = embeddings.embed_texts([" ".join(sorted(words))])[0]
+        nearest, similarities = embeddings.nearest(catalog.embeddings, query, SEMANTIC_TOP_N)
+        close = similarities >= SEMANTIC_MIN_SIMILARITY
+        if scores.max(initial=0) > 0:
+            scores *= (1 - SEMANTIC_WEIGHT) / scores.max()
+        scores[nearest[close]] += SEMANTIC_WEIGHT * similarities[close]
+    positions = np.flatnonzero(scores > 0)
+    positions = positions[np.argsort(-scores[positions], kind="stable")]  # Sorted once, sliced by every hit
+    result = (positions, scores[positions])
+    for array in result:
+        array.setflags(write=False)  # Shared between requests
+    with _score_cache_lock:
+        _score_cache[key] = (now, result)
+        _score_cache.move_to_end(key)
+        while len(_score_cache) > RECOMMEND_CACHE_SIZE:
+            _score_cache.popitem(last=False)
+    return result
+
+def recommend_events(skills, k=RECOMMEND_TOP_K, username=None):
+    """
+    Recommend up to k events for a comma-separated interests string, best matches first.
+    With a username, events similar to ones they rated are mixed in and rated ones left out.
+    Each result is the event dict plus its relevance "score".
+    """
+    catalog = get_catalog()
+    positions, matched = text_scores(catalog, skills)
+    if username is None:
+        ranked, scores = positions[:k], matched[:k]
+    else:
+        dense = np.zeros(len(catalog.events), dtype=np.float32)
+        dense[positions] = matched
+        dense = _blend_ratings(catalog, dense, username)
+        ranked = top_k(dense, k)
+        scores = dense[ranked]
+    return [dict(catalog.events[position], score=round(float(score), 3)) for position, score in zip(ranked, scores)]
+
+def interest_profiles():
+    """Interests text per user, built from the titles of their stored achievements."""
+    return {
+        username: " ".join(record.get("title") or "" for record in records)
+        for username, records in database.list_all_achievements().items()
+    }
+
+def recommend_events_batch(profiles, k=RECOMMEND_TOP_K):
+    """
+    Recommend events for many users at once from {username: interests string}. Users with the
+    same interest words share one query, and each chunk of distinct queries is scored with one
+    sparse (queries x terms) @ (terms x events) product, blended with embedding similarity as in
+    text_scores. No ratings blend: results match recommend_events(interests) without a username,
+    up to float32 rounding (an event right at the SEMANTIC_TOP_N cut-off may fall either side).
+    Returns {username: results as from recommend_events}.
+    """
+    catalog = get_catalog()
+    events_by_term = catalog.matrix.T.tocsr()
+    users_by_words = {}
+    for username, interests in profiles.items():
+        users_by_words.setdefault(" ".join(sorted(set(tokenize(interests)))), []).append(username)
+    distinct = list(users_by_words)
+    results = {}
+    for chunk_start in range(0, len(distinct), BATCH_CHUNK_USERS):
+        chunk = distinct[chunk_start:chunk_start + BATCH_CHUNK_USERS]
+        rows, cols, weights = [], [], []
+        for row, words in enumerate(chunk):
+            for term_id, weight in query_weights(catalog, words).items():
+                rows.append(row)
+                cols.append(term_id)
+                weights.append(weight)
+        queries = sparse.csr_matrix((weights, (rows, cols)), shape=(len(chunk), len(catalog.vocabulary)), dtype=np.float32)
+        scores = queries @ events_by_term  # queries x events, sparse
+        if catalog.embeddings is not None:
+            # 🧭 Same blend as text_scores, for the whole chunk: each row's BM25 scaled to (1 - SEMANTIC_WEIGHT)
+            # of its best score, plus SEMANTIC_WEIGHT x the similarity of its close neighbours
+            row_lengths = np.diff(scores.indptr)
+            best_scores = np.zeros(len(chunk), dtype=np.float32)
+            best_scores[row_lengths > 0] = np.maximum.reduceat(scores.data, scores.indptr[:-1][row_lengths > 0])
+            scores.data *= np.repeat((1 - SEMANTIC_WEIGHT) / np.maximum(best_scores, 1e-30), row_lengths)
+            semantic = embeddings.nearest_batch(catalog.embeddings, embeddings.embed_texts(chunk), SEMANTIC_TOP_N,
+                                                SEMANTIC_MIN_SIMILARITY)
+            has_words = np.array([bool(words) for words in chunk], dtype=np.float32)  # No words, no semantic match
+            scores = scores + sparse.diags(has_words * SEMANTIC_WEIGHT) @ semantic
+        for row, words in enumerate(chunk):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            positions, values = scores.indices[start:end], scores.data[start:end]
+            best = top_k(values, k, positions)
+            recommended = [
+                dict(catalog.events[position], score=round(float(score), 3))
+                for position, score in zip(positions[best], values[best])
+            ]
+            for username in users_by_words[words]:
+                results[username] = recommended
+    return results
+
+# ✅ Weekly digests and benchmarks (Optional): python -m utils.recommender digest|bench
+if __name__ == "__main__":
+    import argparse
+    import itertools
+    import random
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Event recommendation digests and benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    digest = commands.add_parser("digest", help="Recommend events for every user with achievements, written as JSON")
+    digest.add_argument("--output", default="event_digests.json")
+    digest.add_argument("--k", type=int, default=RECOMMEND_TOP_K)
+    bench = commands.add_parser("bench", help="Time single and batch queries on a synthetic catalog")
+    bench.add_argument("--events", type=int, default=50000)
+    bench.add_argument("--users", type=int, default=20000)
+    args = parser.parse_args()
+
+    if args.command == "digest":
+        start = time.perf_counter()
+        digests = recommend_events_batch(interest_profiles(), args.k)
+        database.write_atomic(args.output, digests)
+        print(f"📬 Wrote digests for {len(digests)} users to {args.output} in {time.perf_counter() - start:.2f}s")
+
+    if args.command == "bench":
+        # Zipf-distributed vocabulary: a few common topics, a long tail of specific ones
+        rng = random.Random(0)
+        words = ("ai machine learning data science robotics coding web cloud security hacking energy solar "
+                 "vehicles design finance quiz debate music sports research paper startup blockchain iot").split()
+        words += [f"topic{i}" for i in range(5000)]
+        zipf = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))  # Cumulative weights
+        events = [{"title": f"{' '.join(rng.choices(words, cum_weights=zipf, k=3)).title()} {i}", "category": rng.choice(words[:40]).title(),
+                   "description": " ".join(rng.choices(words, cum_weights=zipf, k=12))} for i in range(args.events)]
+        EVENTS_FILE = os.path.join(tempfile.mkdtemp(), "events.json")
+        with open(EVENTS_FILE, "w") as f:
+            json.dump(events, f)
+        start = time.perf_counter()
+        catalog = get_catalog()
+        print(f"Loaded {args.events} events ({catalog.matrix.nnz} weights) in {time.perf_counter() - start:.2f}s")
+        queries = ["AI, coding", "cybersecurity", "machine learning, data science", "solar energy, topic120", "topic77"]
+        for label in ("cold (scored)", "hot (cached)"):
+            start = time.perf_counter()
+            for _ in range(100):
+                for query in queries:
+                    if label.startswith("cold"):
+                        _score_cache.clear()
+                    recommend_events(query)
+            print(f"{label}: {(time.perf_counter() - start) / (100 * len(queries)) * 1e3:.3f} ms per query")
+        profiles = {f"student{i}": ", ".join(rng.choices(words, cum_weights=zipf, k=3)) for i in range(args.users)}
+        start = time.perf_counter()
+        recommend_events_batch(profiles)
+        print(f"Batch: {args.users} users ({len({frozenset(tokenize(p)) for p in profiles.values()})} distinct interest sets) "
+              f"in {time.perf_counter() - start:.2f}s")